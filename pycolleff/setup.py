@@ -40,7 +40,7 @@ setup(
     install_requires=_requirements,
     package_data={'pycolleff': ['VERSION']},
     include_package_data=True,
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     zip_safe=False,
     scripts=[
         'scripts/ems-wake-analysis.py',